@@ -1,83 +1,250 @@
-import json
+import hashlib
+import re
+import threading
 from datetime import datetime
-from typing import Any
+from functools import lru_cache
+from hmac import compare_digest
+from typing import TYPE_CHECKING, Any
 
-import boto3
-from botocore.exceptions import BotoCoreError, ClientError
-from flask import Flask, request
-from mypy_boto3_sqs import SQSClient
+import ciso8601
+import orjson
+from flask import Flask, Response, request
+from flask.json.provider import JSONProvider
+from werkzeug.exceptions import RequestEntityTooLarge
 
-from .config import AWS_REGION, SQS_URL, TOKEN_SSM_PARAM, logger
+from .batcher import SqsBatcher
+from .config import (
+    AWS_CLIENT_LOCK,
+    AWS_REGION,
+    MAX_BODY_BYTES,
+    SQS_BATCH_LINGER_MS,
+    SQS_MESSAGE_GROUP_ID,
+    SQS_URL,
+    TOKEN_SSM_PARAM,
+    WARM_UP_CONNECTIONS,
+    get_boto_config,
+    logger,
+)
 from .deps import get_token_from_ssm
+from .parsing import extract_fields
+
+if TYPE_CHECKING:
+    from mypy_boto3_sqs import SQSClient
+
+# Top-level body fields /submit validates; the rest is forwarded untouched
+SUBMIT_FIELDS = ("token", "email_timestream")
+
+# Seconds a request waits for its message's batch to be acknowledged by SQS
+SQS_SEND_TIMEOUT = 5
+
+# Fast path for the common ISO-8601 shapes with field ranges; only days 29-31
+# need a calendar check, anything else falls back to datetime.fromisoformat.
+# ASCII-only so \d does not match other Unicode digits, as fromisoformat does not
+_ISO_RE = re.compile(
+    r"(?!0000)\d{4}-(?:0[1-9]|1[0-2])-(?P<day>0[1-9]|[12]\d|3[01])"
+    r"(?:[T ](?:[01]\d|2[0-3]):[0-5]\d(?::[0-5]\d(?:\.\d{1,6})?)?"
+    r"(?:Z|[+-](?:[01]\d|2[0-3]):?[0-5]\d)?)?",
+    re.ASCII,
+)
+
+# Response bodies are identical on every request, so serialize them once
+_RESP_HEALTHY = (
+    orjson.dumps(
+        {
+            "status": "healthy",
+            "service": "checkpoint-home-assignment-api-ms",
+            "endpoints": ["/submit"],
+        }
+    ),
+    200,
+)
+_RESP_BAD_JSON = (orjson.dumps({"error": "Invalid JSON payload"}), 400)
+_RESP_MISSING_FIELDS = (
+    orjson.dumps({"error": "Missing token or email_timestream"}),
+    400,
+)
+_RESP_INTERNAL_ERROR = (orjson.dumps({"error": "Internal server error"}), 500)
+_RESP_INVALID_TOKEN = (orjson.dumps({"error": "Invalid token"}), 403)
+_RESP_INVALID_TIMESTREAM = (orjson.dumps({"error": "Invalid timestream format"}), 400)
+_RESP_QUEUE_FAILED = (orjson.dumps({"error": "Failed to queue message"}), 500)
+_RESP_TOO_LARGE = (orjson.dumps({"error": "Payload too large"}), 413)
+_RESP_ACCEPTED = (orjson.dumps({"message": "Payload accepted and queued."}), 200)
+
+
+def _get_sqs() -> "SQSClient":
+    """Return the process-wide SQS client, creating it on first use."""
+    with AWS_CLIENT_LOCK:
+        return _create_sqs()
+
+
+@lru_cache(maxsize=1)
+def _create_sqs() -> "SQSClient":
+    """Create the SQS client; boto3 is imported lazily to speed boot."""
+    import boto3
 
-# Initialize AWS clients - fail fast if not possible
-try:
     logger.debug("Initializing SQS client")
-    sqs: SQSClient = boto3.client("sqs", region_name=AWS_REGION)
+    sqs: SQSClient = boto3.client(
+        "sqs", region_name=AWS_REGION, config=get_boto_config()
+    )
     logger.info("AWS SQS client initialized successfully")
-except (BotoCoreError, ClientError) as e:
-    logger.error(f"Failed to initialize SQS client: {e}")
-    raise SystemExit(1) from e
+    return sqs
+
+
+def _get_batcher() -> SqsBatcher:
+    """Return the process-wide SQS batcher, creating it on first use.
+
+    Concurrent first requests may both get here before either has finished;
+    the lock makes sure only one batcher and sender thread exist.
+    """
+    with AWS_CLIENT_LOCK:
+        return _create_batcher()
+
+
+@lru_cache(maxsize=1)
+def _create_batcher() -> SqsBatcher:
+    return SqsBatcher(
+        _get_sqs(),
+        SQS_URL,
+        linger_ms=SQS_BATCH_LINGER_MS,
+        message_group_id=SQS_MESSAGE_GROUP_ID,
+    )
+
+
+def _warm_up_connections() -> None:
+    """Establish the SSM and SQS connections ahead of the first request."""
+    # Fetching the token also primes the token cache and needs no extra IAM
+    try:
+        get_token_from_ssm(TOKEN_SSM_PARAM)
+    except Exception as e:
+        logger.warning("SSM connection warm-up failed: %s", e)
+
+    try:
+        _get_sqs().get_queue_attributes(QueueUrl=SQS_URL, AttributeNames=["QueueArn"])
+    except Exception as e:
+        # The TLS connection is still pooled even if the call is not authorized
+        logger.warning("SQS connection warm-up failed: %s", e)
+
+    logger.debug("AWS connection warm-up finished")
+
+
+def _json_response(resp: tuple[bytes, int]) -> Response:
+    """Wrap a pre-serialized (body, status) pair in a JSON response."""
+    body, status = resp
+    return Response(body, status=status, mimetype="application/json")
+
+
+def _is_valid_timestream(value: object) -> bool:
+    """Validate an ISO-8601 timestamp, only building a datetime when ambiguous."""
+    if not isinstance(value, str):
+        return False
+    match = _ISO_RE.fullmatch(value)
+    if match is not None and int(match["day"]) <= 28:
+        return True
+    try:
+        if match is not None:
+            ciso8601.parse_datetime(value)
+        else:
+            # Rarer forms the regex does not cover (basic format, hour-only
+            # times, 7+ digit fractions, ...) keep the fromisoformat contract
+            datetime.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def health_check() -> Response:
+    """Health check endpoint."""
+    return _json_response(_RESP_HEALTHY)
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson for faster (de)serialization."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
 
 
 def create_app() -> Flask:
     """Application factory function."""
     app: Flask = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    # Werkzeug rejects larger bodies before they are read or parsed
+    app.config["MAX_CONTENT_LENGTH"] = MAX_BODY_BYTES
 
-    @app.route("/", methods=["GET"])
-    def health_check() -> tuple[dict[str, Any], int]:
-        """Health check endpoint."""
-        logger.debug("Health check request received")
-        return {
-            "status": "healthy",
-            "service": "checkpoint-home-assignment-api-ms",
-            "endpoints": ["/submit"],
-        }, 200
+    @app.errorhandler(RequestEntityTooLarge)
+    def payload_too_large(e: RequestEntityTooLarge) -> Response:
+        logger.warning("Request body exceeds MAX_BODY_BYTES")
+        return _json_response(_RESP_TOO_LARGE)
+
+    if WARM_UP_CONNECTIONS:
+        threading.Thread(
+            target=_warm_up_connections, name="aws-warm-up", daemon=True
+        ).start()
+
+    # Polled constantly by load balancers: no logging and no automatic OPTIONS
+    app.add_url_rule(
+        "/",
+        view_func=health_check,
+        methods=["GET"],
+        provide_automatic_options=False,
+    )
 
     @app.route("/submit", methods=["POST"])
-    def submit() -> tuple[dict[str, Any], int]:
+    def submit() -> Response:
         logger.debug("Received submit request")
 
+        # Outside the try below so oversized bodies reach the 413 handler
+        raw: bytes = request.get_data(cache=False)
+
         try:
-            data: dict[str, Any] = request.get_json(force=True)
-            logger.debug(f"Request data received: {list(data.keys())}")
+            fields = extract_fields(raw, SUBMIT_FIELDS)
+            logger.debug("Request body parsed: %d bytes", len(raw))
         except Exception as e:
-            logger.error(f"Failed to parse JSON request: {e}")
-            return {"error": "Invalid JSON payload"}, 400
+            logger.error("Failed to parse JSON request: %s", e)
+            return _json_response(_RESP_BAD_JSON)
 
-        token: str | None = data.get("token")
-        timestream: str | None = data.get("email_timestream")
+        token: Any = fields["token"]
+        timestream: Any = fields["email_timestream"]
 
         if not token or not timestream:
             logger.warning("Missing required fields in request")
-            return {"error": "Missing token or email_timestream"}, 400
+            return _json_response(_RESP_MISSING_FIELDS)
 
         try:
             expected_token: str = get_token_from_ssm(TOKEN_SSM_PARAM)
             logger.debug("Token retrieved from SSM successfully")
         except Exception as e:
-            logger.error(f"Failed to retrieve token from SSM: {e}")
-            return {"error": "Internal server error"}, 500
+            logger.error("Failed to retrieve token from SSM: %s", e)
+            return _json_response(_RESP_INTERNAL_ERROR)
 
-        if token != expected_token:
+        # Constant-time comparison so response timing does not leak the token;
+        # compare bytes because compare_digest rejects non-ASCII str
+        if not isinstance(token, str) or not compare_digest(
+            token.encode(), expected_token.encode()
+        ):
             logger.warning("Invalid token provided")
-            return {"error": "Invalid token"}, 403
+            return _json_response(_RESP_INVALID_TOKEN)
 
-        try:
-            datetime.fromisoformat(timestream)
-            logger.debug("Timestream format validated successfully")
-        except ValueError:
-            logger.warning(f"Invalid timestream format: {timestream}")
-            return {"error": "Invalid timestream format"}, 400
+        if not _is_valid_timestream(timestream):
+            logger.warning("Invalid timestream format: %r", timestream)
+            return _json_response(_RESP_INVALID_TIMESTREAM)
+        logger.debug("Timestream format validated successfully")
 
         try:
-            response = sqs.send_message(QueueUrl=SQS_URL, MessageBody=json.dumps(data))
-            message_id = response.get("MessageId", "unknown")
-            logger.info(f"Message sent to SQS successfully: {message_id}")
-            return {"message": "Payload accepted and queued."}, 200
+            # Forward the validated body as received rather than re-encoding
+            # it; orjson has already verified it is valid UTF-8
+            # Identical bodies share a key, so client retries are not enqueued twice
+            idempotency_key = hashlib.blake2b(raw, digest_size=16).hexdigest()
+            future = _get_batcher().submit(raw.decode(), idempotency_key)
+            message_id = future.result(timeout=SQS_SEND_TIMEOUT)
+            logger.info("Message sent to SQS successfully: %s", message_id)
+            return _json_response(_RESP_ACCEPTED)
         except Exception as e:
-            logger.error(f"Failed to send message to SQS: {e}")
-            return {"error": "Failed to queue message"}, 500
+            logger.error("Failed to send message to SQS: %s", e)
+            return _json_response(_RESP_QUEUE_FAILED)
 
     return app
 
@@ -91,5 +258,5 @@ if __name__ == "__main__":
     try:
         app.run(host="0.0.0.0", port=80)
     except Exception as e:
-        logger.error(f"Failed to start Flask application: {e}")
+        logger.error("Failed to start Flask application: %s", e)
         raise SystemExit(1) from e
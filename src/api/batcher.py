@@ -0,0 +1,161 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING
+
+from .config import logger
+
+if TYPE_CHECKING:
+    from mypy_boto3_sqs import SQSClient
+    from mypy_boto3_sqs.type_defs import SendMessageBatchRequestEntryTypeDef
+
+# Hard limits imposed by SQS on SendMessageBatch: entries per call, and the
+# summed size of all message bodies and attributes in the call
+SQS_MAX_BATCH_SIZE = 10
+SQS_MAX_BATCH_BYTES = 256 * 1024
+
+# (entry, future resolved with its MessageId, entry size in bytes)
+_Item = tuple["SendMessageBatchRequestEntryTypeDef", Future[str], int]
+
+
+class SqsBatcher:
+    """Coalesce individual SQS messages into SendMessageBatch calls.
+
+    Messages are buffered until either max_batch_size are pending, the next one
+    would push the batch past max_batch_bytes, or the first one has waited
+    linger_ms, then sent with a single API call from a background thread (a
+    greenlet under gevent). Each submit() returns a Future resolved with the SQS
+    MessageId, or with the error if the message was not accepted.
+    """
+
+    def __init__(
+        self,
+        client: "SQSClient",
+        queue_url: str,
+        max_batch_size: int = SQS_MAX_BATCH_SIZE,
+        linger_ms: int = 200,
+        message_group_id: str = "default",
+        max_batch_bytes: int = SQS_MAX_BATCH_BYTES,
+    ) -> None:
+        if not 1 <= max_batch_size <= SQS_MAX_BATCH_SIZE:
+            raise ValueError(
+                f"max_batch_size must be between 1 and {SQS_MAX_BATCH_SIZE}"
+            )
+        self.client = client
+        self.queue_url = queue_url
+        self.max_batch_size = max_batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.linger = linger_ms / 1000
+        # FIFO queues deduplicate natively and require a message group
+        self.fifo = queue_url.endswith(".fifo")
+        self.message_group_id = message_group_id
+        self._queue: queue.Queue[_Item | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, body: str, idempotency_key: str | None = None) -> Future[str]:
+        """Queue a message body for the next batch.
+
+        The idempotency key becomes the MessageDeduplicationId on FIFO queues
+        and an "Idempotency" message attribute on standard queues, so retried
+        submissions can be recognised downstream.
+        """
+        entry: SendMessageBatchRequestEntryTypeDef = {"Id": "", "MessageBody": body}
+        size = len(body.encode())
+        if self.fifo:
+            entry["MessageGroupId"] = self.message_group_id
+            if idempotency_key is not None:
+                entry["MessageDeduplicationId"] = idempotency_key
+        elif idempotency_key is not None:
+            entry["MessageAttributes"] = {
+                "Idempotency": {"DataType": "String", "StringValue": idempotency_key}
+            }
+            # SQS counts attribute name, type and value towards the payload
+            size += len("Idempotency") + len("String") + len(idempotency_key.encode())
+
+        future: Future[str] = Future()
+        self._ensure_started()
+        self._queue.put((entry, future, size))
+        return future
+
+    def close(self, timeout: float | None = None) -> None:
+        """Flush pending messages and stop the background sender."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _ensure_started(self) -> None:
+        # Started lazily so each forked Gunicorn worker gets its own sender
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                logger.debug("Starting SQS batch sender")
+                self._thread = threading.Thread(
+                    target=self._run, name="sqs-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        # An item that did not fit in the previous batch starts the next one
+        carry: _Item | None = None
+        while True:
+            first = carry if carry is not None else self._queue.get()
+            carry = None
+            if first is None:
+                return
+
+            batch = [first]
+            size = first[2]
+            stop = False
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                if size + item[2] > self.max_batch_bytes:
+                    carry = item
+                    break
+                batch.append(item)
+                size += item[2]
+
+            self._send(batch)
+            if stop:
+                return
+
+    def _send(self, batch: list[_Item]) -> None:
+        # Ids only need to be unique within a batch; they map results back
+        entries = [entry for entry, _, _ in batch]
+        for i, entry in enumerate(entries):
+            entry["Id"] = str(i)
+        try:
+            response = self.client.send_message_batch(
+                QueueUrl=self.queue_url, Entries=entries
+            )
+        except Exception as e:
+            logger.error("Failed to send message batch to SQS: %s", e)
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        logger.debug("Sent batch of %d messages to SQS", len(batch))
+        for success in response.get("Successful", []):
+            batch[int(success["Id"])][1].set_result(success["MessageId"])
+        for failure in response.get("Failed", []):
+            batch[int(failure["Id"])][1].set_exception(
+                RuntimeError(
+                    f"SQS rejected message: {failure['Code']} "
+                    f"{failure.get('Message', '')}".strip()
+                )
+            )
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("SQS returned no result for message"))
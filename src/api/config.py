@@ -1,6 +1,16 @@
+import atexit
 import logging
 import os
 import sys
+import threading
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import TYPE_CHECKING
+
+from gevent.monkey import get_original
+
+if TYPE_CHECKING:
+    from botocore.config import Config
 
 
 class LevelBasedFormatter(logging.Formatter):
@@ -15,6 +25,9 @@ class LevelBasedFormatter(logging.Formatter):
         )
 
         self.info_formatter = logging.Formatter(self.info_format)
+        self.debug_formatter = logging.Formatter(self.debug_format)
+        # pathname -> module name, so each path is only split once
+        self._module_names: dict[str, str] = {}
 
     def format(self, record: logging.LogRecord) -> str:
         if record.levelno == logging.DEBUG:
@@ -23,7 +36,10 @@ class LevelBasedFormatter(logging.Formatter):
                 # For module-level calls, derive module name from pathname
                 # record.pathname gives us full path like '/path/to/module.py'
                 # We want just the module name (e.g., 'config' from 'config.py')
-                module_name = os.path.splitext(os.path.basename(record.pathname))[0]
+                module_name = self._module_names.get(record.pathname)
+                if module_name is None:
+                    module_name = os.path.splitext(os.path.basename(record.pathname))[0]
+                    self._module_names[record.pathname] = module_name
                 location = f"{module_name}:{record.lineno}"
             else:
                 # For function calls, show function name and line number
@@ -31,24 +47,62 @@ class LevelBasedFormatter(logging.Formatter):
 
             # Add the location to the record
             record.location = location
-            formatter = logging.Formatter(self.debug_format)
-            return formatter.format(record)
+            return self.debug_formatter.format(record)
         else:
             return self.info_formatter.format(record)
 
 
 # Configure single logger with level-based formatting
 logger = logging.getLogger("api")
-logger.setLevel(logging.DEBUG)
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+
+
+class _NativeQueueListener(QueueListener):
+    """QueueListener that runs on an OS thread even after gevent patching.
+
+    A patched threading.Thread is a greenlet, so its stdout writes would block
+    the hub; the original _thread primitives give the listener its own thread.
+    """
+
+    def start(self) -> None:
+        self._stopped = get_original("_thread", "allocate_lock")()
+        self._stopped.acquire()
+        get_original("_thread", "start_new_thread")(self._run, ())
+
+    def _run(self) -> None:
+        try:
+            # stop() enqueues None as the sentinel
+            while (record := self.dequeue(True)) is not None:
+                self.handle(record)
+        finally:
+            self._stopped.release()
+
+    def stop(self) -> None:
+        self.enqueue_sentinel()
+        self._stopped.acquire()
+
 
-# Remove any existing handlers
+# Remove any existing handlers, except the queue handler left by an earlier
+# import of this module: its listener is reused rather than started twice
+queue_handler: QueueHandler | None = None
 for handler in logger.handlers[:]:
-    logger.removeHandler(handler)
+    if queue_handler is None and isinstance(handler, QueueHandler) and handler.listener:
+        queue_handler = handler
+    else:
+        logger.removeHandler(handler)
 
-# Add custom handler with level-based formatter
-handler = logging.StreamHandler(sys.stdout)
-handler.setFormatter(LevelBasedFormatter())
-logger.addHandler(handler)
+# Hand records to a background listener so request handlers never block on
+# stdout writes. QueueHandler still merges the %-style arguments into the
+# message on the calling thread; the listener applies the layout and writes.
+if queue_handler is None:
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(LevelBasedFormatter())
+    queue_handler = QueueHandler(get_original("queue", "SimpleQueue")())
+    queue_handler.listener = _NativeQueueListener(queue_handler.queue, stream_handler)
+    queue_handler.listener.start()
+    atexit.register(queue_handler.listener.stop)
+    logger.addHandler(queue_handler)
+log_listener = queue_handler.listener
 logger.propagate = False
 
 # Shared AWS configuration - fail fast if not set
@@ -57,11 +111,49 @@ try:
     SQS_URL: str = os.environ["SQS_QUEUE_URL"]
     TOKEN_SSM_PARAM: str = os.environ["TOKEN_SSM_PARAM"]
     logger.info(
-        f"Environment configured: region={AWS_REGION}, ssm_param={TOKEN_SSM_PARAM}"
+        "Environment configured: region=%s, ssm_param=%s", AWS_REGION, TOKEN_SSM_PARAM
     )
-    logger.debug(f"AWS Region: {AWS_REGION}")
-    logger.debug(f"SQS URL: {SQS_URL}")
-    logger.debug(f"Token SSM Param: {TOKEN_SSM_PARAM}")
+    logger.debug("AWS Region: %s", AWS_REGION)
+    logger.debug("SQS URL: %s", SQS_URL)
+    logger.debug("Token SSM Param: %s", TOKEN_SSM_PARAM)
 except KeyError as e:
-    logger.error(f"Missing required environment variable: {e}")
+    logger.error("Missing required environment variable: %s", e)
     raise SystemExit(1) from e
+
+# Optional tuning knobs with sensible defaults
+TOKEN_TTL: int = int(os.environ.get("TOKEN_TTL", "300"))
+# SQS caps messages at 256 KB; anything near that is not a legitimate submission
+MAX_BODY_BYTES: int = int(os.environ.get("MAX_BODY_BYTES", str(64 * 1024)))
+SQS_BATCH_LINGER_MS: int = int(os.environ.get("SQS_BATCH_LINGER_MS", "200"))
+SQS_MESSAGE_GROUP_ID: str = os.environ.get("SQS_MESSAGE_GROUP_ID", "submissions")
+# Open AWS connections at startup so the first request skips TCP/TLS setup
+WARM_UP_CONNECTIONS: bool = os.environ.get("WARM_UP_CONNECTIONS", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+AWS_MAX_POOL_CONNECTIONS: int = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "50"))
+# Seconds to wait for an AWS response before giving up on the attempt
+AWS_READ_TIMEOUT: int = int(os.environ.get("AWS_READ_TIMEOUT", "60"))
+
+
+# boto3's default session is not thread-safe, so AWS clients (and the objects
+# wrapping them) are created one at a time; reentrant for nested getters
+AWS_CLIENT_LOCK = threading.RLock()
+
+
+@lru_cache(maxsize=1)
+def get_boto_config() -> "Config":
+    """Shared botocore settings, built lazily so importing the app skips botocore.
+
+    A pool large enough for concurrent greenlets, adaptive retries to ride out
+    throttling, a bounded read timeout, and keep-alive on pooled sockets.
+    """
+    from botocore.config import Config
+
+    return Config(
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        retries={"max_attempts": 5, "mode": "adaptive"},
+        read_timeout=AWS_READ_TIMEOUT,
+        tcp_keepalive=True,
+    )
@@ -1,20 +1,102 @@
-import boto3
-from mypy_boto3_ssm import SSMClient
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
-from .config import AWS_REGION, logger
+from .config import (
+    AWS_CLIENT_LOCK,
+    AWS_READ_TIMEOUT,
+    AWS_REGION,
+    TOKEN_TTL,
+    get_boto_config,
+    logger,
+)
+
+if TYPE_CHECKING:
+    from mypy_boto3_ssm import SSMClient
+
+# param_name -> (fetched_at monotonic timestamp, decrypted value)
+_CACHE: dict[str, tuple[float, str]] = {}
+# param_name -> pending fetch shared by every caller waiting on that parameter
+_INFLIGHT: dict[str, Future[str]] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def _get_ssm() -> "SSMClient":
+    """Return the process-wide SSM client, creating it on first use."""
+    with AWS_CLIENT_LOCK:
+        return _create_ssm()
+
+
+@lru_cache(maxsize=1)
+def _create_ssm() -> "SSMClient":
+    """Create the SSM client; one per process so its pool is reused."""
+    import boto3
+
+    ssm: SSMClient = boto3.client(
+        "ssm", region_name=AWS_REGION, config=get_boto_config()
+    )
+    return ssm
 
 
 def get_token_from_ssm(param_name: str) -> str:
-    """Get token from SSM Parameter Store using the configured AWS region."""
+    """Get token from SSM Parameter Store, cached in-process for TOKEN_TTL seconds.
+
+    Only one fetch per parameter is in flight at a time; concurrent callers
+    wait for its result instead of issuing their own. Once the TTL expires the
+    old value is still served while a refresh is running or if it fails, so a
+    transient SSM error does not reject requests holding a valid token.
+    """
+    entry = _CACHE.get(param_name)
+    if entry and time.monotonic() - entry[0] < TOKEN_TTL:
+        return entry[1]
+
+    with _CACHE_LOCK:
+        # Another thread may have refreshed the entry while we waited for the lock
+        entry = _CACHE.get(param_name)
+        if entry and time.monotonic() - entry[0] < TOKEN_TTL:
+            return entry[1]
+
+        future = _INFLIGHT.get(param_name)
+        fetching = future is None
+        if future is None:
+            future = _INFLIGHT[param_name] = Future()
+
+    if not fetching:
+        # Someone else is refreshing: serve the old value, or wait for theirs
+        # (bounded like the SSM call itself, so a hung fetch can't pin waiters)
+        if entry:
+            return entry[1]
+        return future.result(timeout=AWS_READ_TIMEOUT)
+
+    try:
+        value = _fetch_parameter(param_name)
+    except Exception as e:
+        with _CACHE_LOCK:
+            del _INFLIGHT[param_name]
+        future.set_exception(e)
+        if entry:
+            logger.warning("Serving expired SSM parameter %s", param_name)
+            return entry[1]
+        raise
+
+    with _CACHE_LOCK:
+        _CACHE[param_name] = (time.monotonic(), value)
+        del _INFLIGHT[param_name]
+    future.set_result(value)
+    return value
+
+
+def _fetch_parameter(param_name: str) -> str:
     try:
-        logger.debug(f"Retrieving SSM parameter: {param_name}")
-        ssm: SSMClient = boto3.client("ssm", region_name=AWS_REGION)
-        response = ssm.get_parameter(Name=param_name, WithDecryption=True)
+        logger.debug("Retrieving SSM parameter: %s", param_name)
+        response = _get_ssm().get_parameter(Name=param_name, WithDecryption=True)
         value = response["Parameter"]["Value"]
         if not isinstance(value, str):
             raise ValueError(f"Expected string value from SSM parameter {param_name}")
         logger.debug("SSM parameter retrieved successfully")
-        return value
     except Exception as e:
-        logger.error(f"Failed to retrieve SSM parameter {param_name}: {e}")
+        logger.error("Failed to retrieve SSM parameter %s: %s", param_name, e)
         raise
+    return value
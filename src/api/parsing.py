@@ -0,0 +1,16 @@
+from typing import Any
+
+import orjson
+
+
+def extract_fields(raw: bytes, fields: tuple[str, ...]) -> dict[str, Any]:
+    """Return the requested top-level fields of a JSON object body.
+
+    Missing fields map to None.
+
+    Raises ValueError if the body is not valid JSON or not a JSON object.
+    """
+    data = orjson.loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError("JSON payload must be an object")
+    return {field: data.get(field) for field in fields}
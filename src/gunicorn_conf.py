@@ -0,0 +1,39 @@
+"""Gunicorn configuration for the API service.
+
+Settings can be overridden at runtime through GUNICORN_CMD_ARGS, e.g.
+GUNICORN_CMD_ARGS="--worker-class=sync --workers=4" to fall back to sync workers.
+"""
+
+import logging
+import os
+from collections.abc import Mapping
+from typing import Any
+
+bind = "0.0.0.0:80"
+
+# /submit is pure network IO (SSM + SQS), so cooperative workers let each
+# process serve many in-flight requests instead of one per worker
+worker_class = "gevent"
+workers = 2 * (os.cpu_count() or 1) + 1
+worker_connections = 1000
+
+# Recycle workers periodically; jitter avoids restarting them all at once
+max_requests = 1000
+max_requests_jitter = 200
+
+
+class HealthCheckFilter(logging.Filter):
+    """Drop access log entries for load balancer health checks on "/"."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Gunicorn passes the request atoms as a single mapping argument
+        atoms = record.args
+        return not (
+            isinstance(atoms, Mapping)
+            and atoms.get("U") == "/"
+            and atoms.get("m") in ("GET", "HEAD")
+        )
+
+
+def post_worker_init(worker: Any) -> None:
+    logging.getLogger("gunicorn.access").addFilter(HealthCheckFilter())
@@ -0,0 +1,13 @@
+"""WSGI entrypoint for Gunicorn.
+
+gevent must patch the standard library before anything imports socket/ssl
+(boto3 -> urllib3), so the patch has to run before the app import.
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+from api.app import app  # noqa: E402
+
+__all__ = ["app"]
@@ -0,0 +1,79 @@
+"""Shared pytest fixtures."""
+
+import os
+from collections.abc import Generator
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import docker
+import docker.errors
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DOCKER_IMAGE = "checkpoint-api-test"
+
+TEST_ENV = {
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "test",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "SQS_QUEUE_URL": "https://dummy-url",
+    "TOKEN_SSM_PARAM": "/api/token",
+    "WARM_UP_CONNECTIONS": "false",
+}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def aws_env() -> Generator[None, None, None]:
+    """Set the environment and stub boto3 once, then import the app once."""
+    with patch.dict(os.environ, TEST_ENV), patch("boto3.client"):
+        import api.app  # noqa: F401
+
+        yield
+
+
+@pytest.fixture(autouse=True)
+def reset_aws_caches() -> None:
+    """Drop cached AWS clients and tokens so tests cannot leak mocks."""
+    from api import app, deps
+
+    app._create_sqs.cache_clear()
+    app._create_batcher.cache_clear()
+    deps._create_ssm.cache_clear()
+    deps._CACHE.clear()
+    deps._INFLIGHT.clear()
+
+
+def _batch_success(**kwargs: Any) -> dict[str, Any]:
+    return {
+        "Successful": [
+            {"Id": entry["Id"], "MessageId": f"msg-{entry['Id']}"}
+            for entry in kwargs["Entries"]
+        ],
+        "Failed": [],
+    }
+
+
+@pytest.fixture
+def mock_sqs() -> MagicMock:
+    mock_sqs = MagicMock()
+    mock_sqs.send_message_batch.side_effect = _batch_success
+    return mock_sqs
+
+
+@pytest.fixture(scope="session")
+def docker_client() -> Generator[docker.DockerClient, None, None]:
+    """Docker SDK client talking to the daemon over one persistent connection."""
+    client = docker.from_env()
+    yield client
+    client.close()
+
+
+@pytest.fixture(scope="session")
+def docker_image(docker_client: docker.DockerClient) -> str:
+    """Build the service image once and share it across container tests."""
+    try:
+        docker_client.images.build(path=str(PROJECT_ROOT), tag=DOCKER_IMAGE, rm=True)
+    except docker.errors.BuildError as e:
+        pytest.fail(f"Build failed: {e}")
+    return DOCKER_IMAGE
@@ -1,7 +1,13 @@
+import hashlib
+import importlib
 import json
 import os
+import sys
+import threading
+import time
 from collections.abc import Generator
-from unittest.mock import patch
+from typing import Any
+from unittest.mock import MagicMock, patch
 
 import pytest
 from flask.testing import FlaskClient
@@ -9,41 +15,36 @@ from pytest_mock import MockerFixture
 
 
 @pytest.fixture
-def client(mocker: MockerFixture) -> Generator[FlaskClient, None, None]:
-    # Set up environment variables
-    mocker.patch.dict(
-        os.environ,
-        {
-            "AWS_DEFAULT_REGION": "us-east-1",
-            "AWS_ACCESS_KEY_ID": "test",
-            "AWS_SECRET_ACCESS_KEY": "test",
-            "SQS_QUEUE_URL": "https://dummy-url",
-            "TOKEN_SSM_PARAM": "/api/token",
-        },
-    )
-
-    # Mock boto3 client
-    mock_sqs = mocker.MagicMock()
-    mock_sqs.send_message.return_value = {"MessageId": "123"}
-    mocker.patch("boto3.client", return_value=mock_sqs)
+def client(
+    mocker: MockerFixture, mock_sqs: MagicMock
+) -> Generator[FlaskClient, None, None]:
+    from api import app as flask_app
+    from api.batcher import SqsBatcher
 
-    # Mock SSM function
-    mocker.patch("api.deps.get_token_from_ssm", return_value="correct-token")
+    mocker.patch.object(flask_app, "get_token_from_ssm", return_value="correct-token")
 
-    # Import after mocking
-    from api import app as flask_app
+    # Send every message straight away instead of lingering for a full batch
+    batcher = SqsBatcher(mock_sqs, "https://dummy-url", linger_ms=0)
+    mocker.patch.object(flask_app, "_get_batcher", return_value=batcher)
 
     flask_app.app.config["TESTING"] = True
     with flask_app.app.test_client() as client:
         yield client
 
+    batcher.close(timeout=1)
 
-def test_missing_environment_variable() -> None:
+
+def test_missing_environment_variable(mocker: MockerFixture) -> None:
     """Test that the app fails fast when required environment variables are missing."""
+    # Import the api modules afresh; sys.modules is restored when the test ends
+    mocker.patch.dict(sys.modules)
+    for name in ("api.app", "api.batcher", "api.config", "api.deps"):
+        sys.modules.pop(name, None)
+
     # Test missing AWS_DEFAULT_REGION
     with patch.dict(os.environ, {}, clear=True), pytest.raises(SystemExit):
         # This import should trigger SystemExit due to missing AWS_DEFAULT_REGION
-        import api.app  # noqa: F401
+        importlib.import_module("api.app")
 
     # Test missing SQS_QUEUE_URL
     with (
@@ -51,7 +52,19 @@ def test_missing_environment_variable() -> None:
         pytest.raises(SystemExit),
     ):
         # This import should trigger SystemExit due to missing SQS_QUEUE_URL
-        import api.app  # noqa: F401
+        importlib.import_module("api.app")
+
+
+def test_log_listener_survives_reimport(mocker: MockerFixture) -> None:
+    """Re-importing the config reuses the running log listener."""
+    from api import config
+
+    mocker.patch.dict(sys.modules)
+    sys.modules.pop("api.config")
+    reloaded = importlib.import_module("api.config")
+
+    assert reloaded.log_listener is config.log_listener
+    assert reloaded.logger.handlers == config.logger.handlers
 
 
 def test_health_check(client: FlaskClient) -> None:
@@ -64,13 +77,86 @@ def test_health_check(client: FlaskClient) -> None:
     assert "/submit" in data["endpoints"]
 
 
-def test_submit_success(client: FlaskClient) -> None:
+def test_health_check_supports_head(client: FlaskClient) -> None:
+    # The load test readiness probe relies on HEAD to skip the body
+    response = client.head("/")
+    assert response.status_code == 200
+    assert response.data == b""
+
+
+def test_health_check_has_no_automatic_options(client: FlaskClient) -> None:
+    response = client.options("/")
+    assert response.status_code == 405
+
+
+def test_warm_up_connections(mocker: MockerFixture, mock_sqs: MagicMock) -> None:
+    from api import app as flask_app
+
+    get_token = mocker.patch.object(flask_app, "get_token_from_ssm")
+    mocker.patch.object(flask_app, "_get_sqs", return_value=mock_sqs)
+    mock_sqs.get_queue_attributes.side_effect = Exception("AccessDenied")
+
+    # Failures are logged, never raised, since warm-up is best effort
+    flask_app._warm_up_connections()
+
+    get_token.assert_called_once_with(flask_app.TOKEN_SSM_PARAM)
+    mock_sqs.get_queue_attributes.assert_called_once()
+
+
+def test_aws_clients_are_created_once_under_concurrency(
+    mocker: MockerFixture,
+) -> None:
+    from api import app as flask_app
+
+    def slow_client(*args: Any, **kwargs: Any) -> MagicMock:
+        time.sleep(0.05)
+        return MagicMock()
+
+    boto3_client = mocker.patch("boto3.client", side_effect=slow_client)
+    batchers: list[Any] = []
+    threads = [
+        threading.Thread(target=lambda: batchers.append(flask_app._get_batcher()))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=2)
+
+    assert len(batchers) == 4
+    assert all(batcher is batchers[0] for batcher in batchers)
+    boto3_client.assert_called_once()
+
+
+def test_submit_success(client: FlaskClient, mock_sqs: MagicMock) -> None:
     payload = {"token": "correct-token", "email_timestream": "2024-06-01T12:00:00"}
     response = client.post(
         "/submit", data=json.dumps(payload), content_type="application/json"
     )
     assert response.status_code == 200
     assert response.get_json()["message"] == "Payload accepted and queued."
+    mock_sqs.send_message_batch.assert_called_once()
+
+
+def test_submit_forwards_raw_body(client: FlaskClient, mock_sqs: MagicMock) -> None:
+    body = '{"email_timestream": "2024-06-01T12:00:00",  "token": "correct-token"}'
+    response = client.post("/submit", data=body, content_type="application/json")
+    assert response.status_code == 200
+
+    entries = mock_sqs.send_message_batch.call_args.kwargs["Entries"]
+    assert [entry["MessageBody"] for entry in entries] == [body]
+
+
+def test_submit_sets_idempotency_key(client: FlaskClient, mock_sqs: MagicMock) -> None:
+    body = '{"token": "correct-token", "email_timestream": "2024-06-01T12:00:00"}'
+    for _ in range(2):
+        client.post("/submit", data=body, content_type="application/json")
+
+    keys = [
+        call.kwargs["Entries"][0]["MessageAttributes"]["Idempotency"]["StringValue"]
+        for call in mock_sqs.send_message_batch.call_args_list
+    ]
+    assert keys == [hashlib.blake2b(body.encode(), digest_size=16).hexdigest()] * 2
 
 
 def test_submit_invalid_token(client: FlaskClient) -> None:
@@ -81,6 +167,16 @@ def test_submit_invalid_token(client: FlaskClient) -> None:
     assert response.status_code == 403
 
 
+@pytest.mark.parametrize("token", ["correct-tokeN", "correct-token-x", "tökén", 123])
+def test_submit_rejects_mismatched_token(client: FlaskClient, token: object) -> None:
+    payload = {"token": token, "email_timestream": "2024-06-01T12:00:00"}
+    response = client.post(
+        "/submit", data=json.dumps(payload), content_type="application/json"
+    )
+    assert response.status_code == 403
+    assert response.get_json()["error"] == "Invalid token"
+
+
 def test_submit_invalid_time(client: FlaskClient) -> None:
     payload = {"token": "correct-token", "email_timestream": "not-a-timestamp"}
     response = client.post(
@@ -89,6 +185,43 @@ def test_submit_invalid_time(client: FlaskClient) -> None:
     assert response.status_code == 400
 
 
+@pytest.mark.parametrize(
+    ("timestream", "expected_status"),
+    [
+        ("2024-06-01", 200),
+        ("2024-06-01 12:00", 200),
+        ("2024-06-01T12:00:00.123456Z", 200),
+        ("2024-06-01T12:00:00+05:30", 200),
+        ("2024-02-29T12:00:00", 200),
+        ("2023-02-29T12:00:00", 400),
+        ("2024-04-31T12:00:00", 400),
+        ("2024-13-01T12:00:00", 400),
+        ("2024-06-01T25:00:00", 400),
+        ("0000-06-01T12:00:00", 400),
+        ("2024-06-01T12:00:00+05", 200),
+        ("2024-06-01T12", 200),
+        ("20240601", 200),
+        ("2024-06-01T12:00:00.1234567", 200),
+        ("20240631", 400),
+        ("not-a-date", 400),
+        ("٢٠٢٤-06-01", 400),
+        ("2024-06-1٥", 400),
+        ("2024-06-01T12:0٥", 400),
+        ("2024-06-01T12:00:00.١٢٣", 400),
+        ("2024-06-01T12:00:00+05:3٠", 400),
+        (20240601, 400),
+    ],
+)
+def test_submit_timestream_validation(
+    client: FlaskClient, timestream: object, expected_status: int
+) -> None:
+    payload = {"token": "correct-token", "email_timestream": timestream}
+    response = client.post(
+        "/submit", data=json.dumps(payload), content_type="application/json"
+    )
+    assert response.status_code == expected_status
+
+
 def test_submit_missing_token(client: FlaskClient) -> None:
     payload = {"email_timestream": "2024-06-01T12:00:00"}
     response = client.post(
@@ -116,11 +249,45 @@ def test_submit_missing_both_fields(client: FlaskClient) -> None:
     assert response.get_json()["error"] == "Missing token or email_timestream"
 
 
-def test_submit_sqs_exception(client: FlaskClient, mocker: MockerFixture) -> None:
-    # Mock SQS to raise an exception - need to patch the sqs variable directly
-    mock_sqs = mocker.MagicMock()
-    mock_sqs.send_message.side_effect = Exception("SQS error")
-    mocker.patch("api.app.sqs", mock_sqs)
+def test_submit_large_payload(client: FlaskClient, mock_sqs: MagicMock) -> None:
+    payload = {
+        "padding": "x" * (32 * 1024),
+        "token": "correct-token",
+        "email_timestream": "2024-06-01T12:00:00",
+    }
+    body = json.dumps(payload)
+    response = client.post("/submit", data=body, content_type="application/json")
+    assert response.status_code == 200
+
+    entries = mock_sqs.send_message_batch.call_args.kwargs["Entries"]
+    assert [entry["MessageBody"] for entry in entries] == [body]
+
+
+def test_submit_invalid_json(client: FlaskClient) -> None:
+    response = client.post(
+        "/submit", data='{"token": ', content_type="application/json"
+    )
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid JSON payload"
+
+
+def test_submit_payload_too_large(client: FlaskClient, mock_sqs: MagicMock) -> None:
+    payload = {
+        "token": "correct-token",
+        "email_timestream": "2024-06-01T12:00:00",
+        "padding": "x" * (64 * 1024),
+    }
+    response = client.post(
+        "/submit", data=json.dumps(payload), content_type="application/json"
+    )
+    assert response.status_code == 413
+    assert response.get_json()["error"] == "Payload too large"
+    mock_sqs.send_message_batch.assert_not_called()
+
+
+def test_submit_sqs_exception(client: FlaskClient, mock_sqs: MagicMock) -> None:
+    # Mock SQS to raise an exception for the whole batch
+    mock_sqs.send_message_batch.side_effect = Exception("SQS error")
 
     payload = {"token": "correct-token", "email_timestream": "2024-06-01T12:00:00"}
     response = client.post(
@@ -130,21 +297,18 @@ def test_submit_sqs_exception(client: FlaskClient, mocker: MockerFixture) -> Non
     assert "Failed to queue message" in response.get_json()["error"]
 
 
-def test_get_token_from_ssm(mocker: MockerFixture) -> None:
-    # Set up environment variables first
-    mocker.patch.dict(
-        os.environ,
-        {
-            "AWS_DEFAULT_REGION": "us-east-1",
-            "SQS_QUEUE_URL": "https://dummy-url",
-            "TOKEN_SSM_PARAM": "/api/token",
-        },
-    )
+@pytest.fixture
+def mock_ssm(mocker: MockerFixture) -> MagicMock:
+    from api import deps
+
+    # Replace the shared SSM client; the token cache is reset by conftest
+    mock_ssm = MagicMock()
+    mocker.patch.object(deps, "_get_ssm", return_value=mock_ssm)
+    return mock_ssm
 
-    # Mock SSM client
-    mock_ssm = mocker.MagicMock()
+
+def test_get_token_from_ssm(mock_ssm: MagicMock) -> None:
     mock_ssm.get_parameter.return_value = {"Parameter": {"Value": "test-token"}}
-    mocker.patch("boto3.client", return_value=mock_ssm)
 
     from api.deps import get_token_from_ssm
 
@@ -155,25 +319,114 @@ def test_get_token_from_ssm(mocker: MockerFixture) -> None:
     )
 
 
-def test_get_token_from_ssm_invalid_type(mocker: MockerFixture) -> None:
-    # Set up environment variables first
-    mocker.patch.dict(
-        os.environ,
-        {
-            "AWS_DEFAULT_REGION": "us-east-1",
-            "SQS_QUEUE_URL": "https://dummy-url",
-            "TOKEN_SSM_PARAM": "/api/token",
-        },
-    )
-
+def test_get_token_from_ssm_invalid_type(mock_ssm: MagicMock) -> None:
     # Mock SSM client to return non-string value
-    mock_ssm = mocker.MagicMock()
     mock_ssm.get_parameter.return_value = {
         "Parameter": {"Value": 123}  # Non-string value
     }
-    mocker.patch("boto3.client", return_value=mock_ssm)
 
     from api.deps import get_token_from_ssm
 
     with pytest.raises(ValueError, match="Expected string value from SSM parameter"):
         get_token_from_ssm("/test/param")
+
+
+def test_get_token_from_ssm_is_cached(mock_ssm: MagicMock) -> None:
+    mock_ssm.get_parameter.return_value = {"Parameter": {"Value": "test-token"}}
+
+    from api.deps import get_token_from_ssm
+
+    assert get_token_from_ssm("/test/param") == "test-token"
+    assert get_token_from_ssm("/test/param") == "test-token"
+    mock_ssm.get_parameter.assert_called_once()
+
+
+def test_get_token_from_ssm_cache_expires(
+    mock_ssm: MagicMock, mocker: MockerFixture
+) -> None:
+    mock_ssm.get_parameter.side_effect = [
+        {"Parameter": {"Value": "old-token"}},
+        {"Parameter": {"Value": "new-token"}},
+    ]
+
+    from api import deps
+
+    mocker.patch.object(deps, "TOKEN_TTL", 0)
+
+    assert deps.get_token_from_ssm("/test/param") == "old-token"
+    assert deps.get_token_from_ssm("/test/param") == "new-token"
+    assert mock_ssm.get_parameter.call_count == 2
+
+
+def test_get_token_from_ssm_serves_expired_value_on_error(
+    mock_ssm: MagicMock, mocker: MockerFixture
+) -> None:
+    mock_ssm.get_parameter.side_effect = [
+        {"Parameter": {"Value": "old-token"}},
+        Exception("SSM unavailable"),
+    ]
+
+    from api import deps
+
+    mocker.patch.object(deps, "TOKEN_TTL", 0)
+
+    assert deps.get_token_from_ssm("/test/param") == "old-token"
+    assert deps.get_token_from_ssm("/test/param") == "old-token"
+    assert mock_ssm.get_parameter.call_count == 2
+
+
+def test_get_token_from_ssm_shares_in_flight_fetch(mock_ssm: MagicMock) -> None:
+    from api import deps
+
+    release = threading.Event()
+
+    def slow_get_parameter(**kwargs: Any) -> dict[str, Any]:
+        release.wait(timeout=2)
+        return {"Parameter": {"Value": "test-token"}}
+
+    mock_ssm.get_parameter.side_effect = slow_get_parameter
+    results: list[str] = []
+
+    def fetch() -> None:
+        results.append(deps.get_token_from_ssm("/test/param"))
+
+    first = threading.Thread(target=fetch)
+    first.start()
+    while "/test/param" not in deps._INFLIGHT:
+        time.sleep(0.001)
+    second = threading.Thread(target=fetch)
+    second.start()
+    time.sleep(0.05)
+    release.set()
+    first.join(timeout=2)
+    second.join(timeout=2)
+
+    assert results == ["test-token", "test-token"]
+    mock_ssm.get_parameter.assert_called_once()
+
+
+def test_get_token_from_ssm_waiter_times_out(
+    mocker: MockerFixture, mock_ssm: MagicMock
+) -> None:
+    from api import deps
+
+    mocker.patch.object(deps, "AWS_READ_TIMEOUT", 0.05)
+    release = threading.Event()
+
+    def hung_get_parameter(**kwargs: Any) -> dict[str, Any]:
+        release.wait(timeout=2)
+        return {"Parameter": {"Value": "test-token"}}
+
+    mock_ssm.get_parameter.side_effect = hung_get_parameter
+    owner = threading.Thread(target=deps.get_token_from_ssm, args=("/test/param",))
+    owner.start()
+    while "/test/param" not in deps._INFLIGHT:
+        time.sleep(0.001)
+
+    try:
+        with pytest.raises(TimeoutError):
+            deps.get_token_from_ssm("/test/param")
+    finally:
+        release.set()
+        owner.join(timeout=2)
+    mock_ssm.get_parameter.assert_called_once()
@@ -0,0 +1,147 @@
+"""Tests for the SQS message batcher."""
+
+from collections.abc import Generator
+from typing import TYPE_CHECKING
+from unittest.mock import MagicMock
+
+import pytest
+
+if TYPE_CHECKING:
+    from api.batcher import SqsBatcher
+
+
+@pytest.fixture
+def batcher(mock_sqs: MagicMock) -> Generator["SqsBatcher", None, None]:
+    from api.batcher import SqsBatcher
+
+    batcher = SqsBatcher(mock_sqs, "https://dummy-url", linger_ms=200)
+    yield batcher
+    batcher.close(timeout=1)
+
+
+def test_invalid_batch_size() -> None:
+    from api.batcher import SqsBatcher
+
+    with pytest.raises(ValueError, match="max_batch_size"):
+        SqsBatcher(MagicMock(), "https://dummy-url", max_batch_size=11)
+
+
+def test_messages_are_coalesced(batcher: "SqsBatcher", mock_sqs: MagicMock) -> None:
+    futures = [batcher.submit(f"body-{i}") for i in range(3)]
+
+    assert [f.result(timeout=2) for f in futures] == ["msg-0", "msg-1", "msg-2"]
+    mock_sqs.send_message_batch.assert_called_once_with(
+        QueueUrl="https://dummy-url",
+        Entries=[
+            {"Id": "0", "MessageBody": "body-0"},
+            {"Id": "1", "MessageBody": "body-1"},
+            {"Id": "2", "MessageBody": "body-2"},
+        ],
+    )
+
+
+def test_batches_are_capped_at_ten(batcher: "SqsBatcher", mock_sqs: MagicMock) -> None:
+    futures = [batcher.submit(f"body-{i}") for i in range(15)]
+
+    for future in futures:
+        future.result(timeout=2)
+    calls = mock_sqs.send_message_batch.call_args_list
+    batch_sizes = [len(call.kwargs["Entries"]) for call in calls]
+    assert batch_sizes == [10, 5]
+
+
+def test_batches_are_capped_by_payload_size(
+    batcher: "SqsBatcher", mock_sqs: MagicMock
+) -> None:
+    # Three 100 KiB bodies exceed the 256 KiB SendMessageBatch payload limit
+    futures = [batcher.submit("x" * (100 * 1024)) for _ in range(3)]
+
+    for future in futures:
+        future.result(timeout=2)
+    calls = mock_sqs.send_message_batch.call_args_list
+    batch_sizes = [len(call.kwargs["Entries"]) for call in calls]
+    assert batch_sizes == [2, 1]
+
+
+def test_payload_size_counts_message_attributes(mock_sqs: MagicMock) -> None:
+    from api.batcher import SqsBatcher
+
+    # Each entry is 4 bytes of body plus 17 bytes of attribute name and type
+    # plus a 3 byte key: two fit in 48 bytes, a third does not
+    batcher = SqsBatcher(
+        mock_sqs, "https://dummy-url", linger_ms=200, max_batch_bytes=48
+    )
+    futures = [batcher.submit("body", idempotency_key=f"k{i:02}") for i in range(3)]
+    for future in futures:
+        future.result(timeout=2)
+    batcher.close(timeout=1)
+
+    calls = mock_sqs.send_message_batch.call_args_list
+    assert [len(call.kwargs["Entries"]) for call in calls] == [2, 1]
+
+
+def test_failed_entry_sets_exception(
+    batcher: "SqsBatcher", mock_sqs: MagicMock
+) -> None:
+    mock_sqs.send_message_batch.side_effect = None
+    mock_sqs.send_message_batch.return_value = {
+        "Successful": [{"Id": "0", "MessageId": "msg-0"}],
+        "Failed": [{"Id": "1", "Code": "InternalError", "SenderFault": False}],
+    }
+
+    ok = batcher.submit("good")
+    failed = batcher.submit("bad")
+
+    assert ok.result(timeout=2) == "msg-0"
+    with pytest.raises(RuntimeError, match="InternalError"):
+        failed.result(timeout=2)
+
+
+def test_client_error_fails_whole_batch(
+    batcher: "SqsBatcher", mock_sqs: MagicMock
+) -> None:
+    mock_sqs.send_message_batch.side_effect = Exception("SQS error")
+
+    futures = [batcher.submit("a"), batcher.submit("b")]
+
+    for future in futures:
+        with pytest.raises(Exception, match="SQS error"):
+            future.result(timeout=2)
+
+
+def test_close_flushes_pending_messages(mock_sqs: MagicMock) -> None:
+    from api.batcher import SqsBatcher
+
+    batcher = SqsBatcher(mock_sqs, "https://dummy-url", linger_ms=10_000)
+    future = batcher.submit("body")
+
+    batcher.close(timeout=2)
+
+    assert future.result(timeout=0) == "msg-0"
+
+
+def test_idempotency_key_on_standard_queue(
+    batcher: "SqsBatcher", mock_sqs: MagicMock
+) -> None:
+    batcher.submit("body", idempotency_key="abc").result(timeout=2)
+
+    (entry,) = mock_sqs.send_message_batch.call_args.kwargs["Entries"]
+    assert entry["MessageAttributes"] == {
+        "Idempotency": {"DataType": "String", "StringValue": "abc"}
+    }
+    assert "MessageDeduplicationId" not in entry
+
+
+def test_idempotency_key_on_fifo_queue(mock_sqs: MagicMock) -> None:
+    from api.batcher import SqsBatcher
+
+    batcher = SqsBatcher(
+        mock_sqs, "https://dummy-url.fifo", linger_ms=0, message_group_id="group"
+    )
+    batcher.submit("body", idempotency_key="abc").result(timeout=2)
+    batcher.close(timeout=1)
+
+    (entry,) = mock_sqs.send_message_batch.call_args.kwargs["Entries"]
+    assert entry["MessageDeduplicationId"] == "abc"
+    assert entry["MessageGroupId"] == "group"
+    assert "MessageAttributes" not in entry
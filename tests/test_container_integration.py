@@ -1,11 +1,11 @@
 """Container integration tests for Gunicorn deployment."""
 
-import subprocess
 import time
 from collections.abc import Generator
-from pathlib import Path
 from typing import Any
 
+import docker
+import docker.errors
 import pytest
 import requests
 
@@ -14,44 +14,25 @@ class TestContainerIntegration:
     """Test the containerized application with Gunicorn."""
 
     @pytest.fixture(scope="class")
-    def container_url(self) -> Generator[str, None, None]:
+    def container_url(
+        self, docker_client: docker.DockerClient, docker_image: str
+    ) -> Generator[str, None, None]:
         """Start container and return URL."""
-        # Get project root directory dynamically
-        project_root = Path(__file__).parent.parent
-
-        # Build the container
-        build_result = subprocess.run(
-            ["docker", "build", "-t", "checkpoint-api-test", "."],
-            cwd=str(project_root),
-            capture_output=True,
-            text=True,
-        )
-        assert build_result.returncode == 0, f"Build failed: {build_result.stderr}"
-
         # Start the container
-        run_result = subprocess.run(
-            [
-                "docker",
-                "run",
-                "-d",
-                "-p",
-                "8081:80",
-                "-e",
-                "AWS_DEFAULT_REGION=us-east-1",
-                "-e",
-                "SQS_QUEUE_URL=https://sqs.us-east-1.amazonaws.com/123456789012/test-queue",
-                "-e",
-                "TOKEN_SSM_PARAM=/api/token",
-                "--name",
-                "test-container",
-                "checkpoint-api-test",
-            ],
-            capture_output=True,
-            text=True,
-        )
-        assert run_result.returncode == 0, (
-            f"Container start failed: {run_result.stderr}"
-        )
+        try:
+            container = docker_client.containers.run(
+                docker_image,
+                detach=True,
+                ports={"80/tcp": 8081},
+                environment={
+                    "AWS_DEFAULT_REGION": "us-east-1",
+                    "SQS_QUEUE_URL": "https://sqs.us-east-1.amazonaws.com/123456789012/test-queue",
+                    "TOKEN_SSM_PARAM": "/api/token",
+                },
+                name="test-container",
+            )
+        except docker.errors.APIError as e:
+            pytest.fail(f"Container start failed: {e}")
 
         # Wait for container to be ready
         time.sleep(3)
@@ -59,8 +40,7 @@ class TestContainerIntegration:
         yield "http://localhost:8081"
 
         # Cleanup
-        subprocess.run(["docker", "stop", "test-container"], capture_output=True)
-        subprocess.run(["docker", "rm", "test-container"], capture_output=True)
+        container.remove(force=True)
 
     def test_health_check_in_container(self, container_url: str) -> None:
         """Test health check endpoint in containerized environment."""
@@ -103,15 +83,11 @@ class TestContainerIntegration:
         max_response_time = max(result["response_time"] for result in results)
         assert max_response_time < 5.0
 
-    def test_container_logs_show_gunicorn(self, container_url: str) -> None:
+    def test_container_logs_show_gunicorn(
+        self, container_url: str, docker_client: docker.DockerClient
+    ) -> None:
         """Verify that Gunicorn is actually running, not Flask dev server."""
-        logs_result = subprocess.run(
-            ["docker", "logs", "test-container"],
-            capture_output=True,
-            text=True,
-        )
-
-        logs = logs_result.stdout + logs_result.stderr
+        logs = docker_client.containers.get("test-container").logs().decode()
 
         # Should see Gunicorn startup messages
         assert "Starting gunicorn" in logs
@@ -1,238 +1,250 @@
 """Load testing using pytest for CI/CD integration."""
 
-import concurrent.futures
-import subprocess
+import asyncio
+import platform
+import threading
 import time
-from collections.abc import Generator
-from pathlib import Path
+from array import array
+from collections.abc import Callable, Generator
+from queue import SimpleQueue
 from typing import Any
 
+import docker
+import docker.errors
+import httpx
 import pytest
-import requests
 
-
-@pytest.fixture(scope="module")
-def container_url() -> Generator[str, None, None]:
-    """Start a test container for load testing."""
-    # Check if container is already running
-    check_result = subprocess.run(
-        ["docker", "ps", "--filter", "name=pytest-load-test", "--format", "{{.Names}}"],
-        capture_output=True,
-        text=True,
+# Largest concurrency used by any load test
+_MAX_CONCURRENCY = 8
+
+# Numeric loopback address so requests never go through the resolver
+_PORT = 8083
+_BASE_URL = f"http://127.0.0.1:{_PORT}"
+
+# Shared keep-alive client so requests reuse pooled sockets across threads
+# instead of opening a new connection per request
+_CLIENT = httpx.Client(
+    timeout=5.0,
+    limits=httpx.Limits(max_keepalive_connections=_MAX_CONCURRENCY, max_connections=16),
+)
+
+
+def _run_requests(
+    make_request: Callable[[int], None], num_requests: int, concurrency: int
+) -> None:
+    """Run make_request num_requests times on concurrency plain threads.
+
+    Request indices are handed out through a SimpleQueue, followed by one
+    None sentinel per thread, so no futures or work items are allocated.
+    """
+    indices: SimpleQueue[int | None] = SimpleQueue()
+    for i in range(num_requests):
+        indices.put(i)
+    for _ in range(concurrency):
+        indices.put(None)
+
+    def worker() -> None:
+        while (i := indices.get()) is not None:
+            make_request(i)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+async def _run_requests_async(
+    url: str,
+    latencies_ns: "array[int]",
+    ok: "array[int]",
+    concurrency: int,
+    timeout: float,
+) -> None:
+    """Issue one GET per slot in ok from a single event loop, concurrency at once.
+
+    A semaphore caps how many requests are in flight, so no threads are
+    involved and every socket wakeup is handled by the same loop.
+    """
+    limits = httpx.Limits(
+        max_keepalive_connections=concurrency, max_connections=concurrency
     )
+    slots = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
 
-    if "pytest-load-test" in check_result.stdout:
-        yield "http://localhost:8083"
-        return
+        async def make_request(i: int) -> None:
+            async with slots:
+                # Timed from acquiring a slot, like the threaded runner, so
+                # waiting for a free connection is not counted as latency
+                start = time.perf_counter_ns()
+                try:
+                    response = await client.get(url)
+                except httpx.HTTPError:
+                    return
+                if response.status_code == 200:
+                    latencies_ns[i] = time.perf_counter_ns() - start
+                    ok[i] = 1
 
-    # Get project root directory dynamically
-    project_root = Path(__file__).parent.parent
+        await asyncio.gather(*(make_request(i) for i in range(len(ok))))
 
-    # Build the image if needed
-    build_result = subprocess.run(
-        ["docker", "build", "-t", "checkpoint-api-test", "."],
-        cwd=str(project_root),
-        capture_output=True,
-        text=True,
-    )
-    if build_result.returncode != 0:
-        pytest.skip(f"Failed to build image: {build_result.stderr}")
 
-    # Start container
-    run_result = subprocess.run(
-        [
-            "docker",
-            "run",
-            "-d",
-            "-p",
-            "8083:80",
-            "-e",
-            "AWS_DEFAULT_REGION=us-east-1",
-            "-e",
-            "SQS_QUEUE_URL=https://sqs.us-east-1.amazonaws.com/123456789012/test-queue",
-            "-e",
-            "TOKEN_SSM_PARAM=/api/token",
-            "--name",
-            "pytest-load-test",
-            "checkpoint-api-test",
-        ],
-        capture_output=True,
-        text=True,
-    )
+@pytest.fixture(scope="module")
+def container_url(
+    request: pytest.FixtureRequest,
+    docker_client: docker.DockerClient,
+    docker_image: str,
+) -> Generator[str, None, None]:
+    """Start a test container for load testing."""
+    request.addfinalizer(_CLIENT.close)
+
+    # Check if container is already running; a direct lookup by name avoids
+    # listing and filtering every container on the daemon
+    try:
+        running = docker_client.containers.get("pytest-load-test").status == "running"
+    except docker.errors.NotFound:
+        running = False
+    if running:
+        yield _BASE_URL
+        return
 
-    if run_result.returncode != 0:
-        pytest.skip(f"Failed to start container: {run_result.stderr}")
+    # The container keeps the image's production Gunicorn config (gevent,
+    # 2 * cpu + 1 workers); only the Gunicorn config test pins the worker count
+    environment = {
+        "AWS_DEFAULT_REGION": "us-east-1",
+        "SQS_QUEUE_URL": "https://sqs.us-east-1.amazonaws.com/123456789012/test-queue",
+        "TOKEN_SSM_PARAM": "/api/token",
+    }
+    network: dict[str, Any]
+    if platform.system() == "Linux":
+        # Share the host network stack so requests skip docker-proxy and NAT
+        network = {"network_mode": "host"}
+        environment["GUNICORN_CMD_ARGS"] = f"--bind=127.0.0.1:{_PORT}"
+    else:
+        # Host networking is unavailable under Docker Desktop
+        network = {"ports": {"80/tcp": _PORT}}
 
-    # Wait for container to be ready
-    for _ in range(10):  # 10 second timeout
+    # Start container
+    try:
+        container = docker_client.containers.run(
+            docker_image,
+            detach=True,
+            environment=environment,
+            name="pytest-load-test",
+            **network,
+        )
+    except docker.errors.APIError as e:
+        pytest.skip(f"Failed to start container: {e}")
+
+    # Wait for container to be ready, polling with exponential backoff so a
+    # fast start is noticed almost immediately. HEAD only needs the status line,
+    # so probes skip rendering and transferring the health check body.
+    deadline = time.perf_counter_ns() + 20 * 10**9
+    delay = 0.05
+    while time.perf_counter_ns() < deadline:
         try:
-            response = requests.get("http://localhost:8083/", timeout=1)
+            response = _CLIENT.head(f"{_BASE_URL}/", timeout=0.5)
             if response.status_code == 200:
                 break
-        except requests.RequestException:
+        except httpx.HTTPError:
             pass
-        time.sleep(1)
+        time.sleep(delay)
+        delay = min(delay * 1.5, 0.5)
     else:
-        subprocess.run(["docker", "stop", "pytest-load-test"], capture_output=True)
-        subprocess.run(["docker", "rm", "pytest-load-test"], capture_output=True)
+        container.remove(force=True)
         pytest.skip("Container failed to become ready")
 
-    yield "http://localhost:8083"
+    yield _BASE_URL
 
     # Cleanup
-    subprocess.run(["docker", "stop", "pytest-load-test"], capture_output=True)
-    subprocess.run(["docker", "rm", "pytest-load-test"], capture_output=True)
+    container.remove(force=True)
 
 
 class TestLoadTesting:
     """Load testing that can be run in CI/CD pipelines."""
 
-    def test_concurrent_health_checks_light_load(self, container_url: str) -> None:
-        """Test handling of multiple concurrent health check requests (light load for CI)."""
-        num_requests = 10
-        concurrency = 4
-
-        def make_request() -> dict[str, Any]:
-            start_time = time.time()
+    @pytest.mark.parametrize(
+        (
+            "runner",
+            "num_requests",
+            "concurrency",
+            "timeout",
+            "min_rps",
+            "min_success",
+            "max_avg",
+        ),
+        [
+            # Light load for CI
+            pytest.param("threads", 10, 4, 5, 5, 0.9, 1.0, id="light-load"),
+            # More concurrent requests than Gunicorn workers on small runners
+            pytest.param(
+                "threads", 8, 8, 10, 0, 0.9, float("inf"), id="exceed-workers"
+            ),
+            # Sustained load for CI validation, driven from a single event loop
+            pytest.param("asyncio", 20, 6, 5, 8, 0.95, 2.0, id="sustained-load"),
+        ],
+    )
+    def test_load(
+        self,
+        container_url: str,
+        runner: str,
+        num_requests: int,
+        concurrency: int,
+        timeout: float,
+        min_rps: float,
+        min_success: float,
+        max_avg: float,
+    ) -> None:
+        """Test handling of concurrent health check requests against one container."""
+        url = f"{container_url}/"
+
+        # Latencies of successful requests and their success flags, written
+        # by index from the workers instead of collecting a dict per request
+        latencies_ns = array("q", bytes(8 * num_requests))
+        ok = array("b", bytes(num_requests))
+
+        def make_request(i: int) -> None:
+            start = time.perf_counter_ns()
             try:
-                response = requests.get(f"{container_url}/", timeout=5)
-                end_time = time.time()
-                return {
-                    "success": response.status_code == 200,
-                    "response_time": end_time - start_time,
-                    "status_code": response.status_code,
-                }
-            except Exception as e:
-                end_time = time.time()
-                return {
-                    "success": False,
-                    "response_time": end_time - start_time,
-                    "error": str(e),
-                }
-
-        start_time = time.time()
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
-            futures = [executor.submit(make_request) for _ in range(num_requests)]
-            results = [
-                future.result() for future in concurrent.futures.as_completed(futures)
-            ]
-
-        end_time = time.time()
-        total_time = end_time - start_time
-
-        # Analyze results
-        successful_requests = [r for r in results if r["success"]]
-        response_times = [r["response_time"] for r in successful_requests]
-
-        # Assertions for CI
-        success_rate = len(successful_requests) / num_requests
-        avg_response_time = (
-            sum(response_times) / len(response_times)
-            if response_times
-            else float("inf")
-        )
-        requests_per_second = num_requests / total_time
+                response = _CLIENT.get(url, timeout=timeout)
+            except httpx.HTTPError:
+                return
+            if response.status_code == 200:
+                latencies_ns[i] = time.perf_counter_ns() - start
+                ok[i] = 1
 
-        assert success_rate >= 0.9, f"Success rate {success_rate:.1%} is below 90%"
-        assert avg_response_time < 1.0, (
-            f"Average response time {avg_response_time:.3f}s is too slow"
-        )
-        assert requests_per_second > 5, (
-            f"Throughput {requests_per_second:.1f} req/s is too low"
-        )
+        start = time.perf_counter_ns()
 
-        print("\n✅ Load test passed:")
-        print(f"   Success rate: {success_rate:.1%}")
-        print(f"   Avg response time: {avg_response_time:.3f}s")
-        print(f"   Requests/sec: {requests_per_second:.1f}")
+        if runner == "asyncio":
+            asyncio.run(
+                _run_requests_async(url, latencies_ns, ok, concurrency, timeout)
+            )
+        else:
+            _run_requests(make_request, num_requests, concurrency)
 
-    def test_concurrent_requests_exceed_workers(self, container_url: str) -> None:
-        """Test that requests exceeding worker count are handled properly."""
-        # Use 8 concurrent requests (more than 4 Gunicorn workers)
-        num_requests = 8
-        concurrency = 8
+        total_time = (time.perf_counter_ns() - start) / 1e9
 
-        def make_request() -> bool:
-            try:
-                response = requests.get(f"{container_url}/", timeout=10)
-                return bool(response.status_code == 200)
-            except Exception:
-                return False
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
-            futures = [executor.submit(make_request) for _ in range(num_requests)]
-            results = [
-                future.result() for future in concurrent.futures.as_completed(futures)
-            ]
-
-        successful_requests = sum(results)
+        # Analyze results; failed requests leave a zero latency behind
+        successful_requests = sum(ok)
         success_rate = successful_requests / num_requests
-
-        # Should handle all requests successfully even with more requests than workers
-        assert success_rate >= 0.9, (
-            f"Success rate {success_rate:.1%} with {num_requests} concurrent requests"
-        )
-
-        print(
-            f"\n✅ Concurrent test passed: {successful_requests}/{num_requests} requests successful"
-        )
-
-    def test_sustained_load_performance(self, container_url: str) -> None:
-        """Test performance under sustained load for CI validation."""
-        num_requests = 20
-        concurrency = 6
-
-        def make_request() -> dict[str, Any]:
-            start_time = time.time()
-            try:
-                response = requests.get(f"{container_url}/", timeout=5)
-                end_time = time.time()
-                return {
-                    "success": response.status_code == 200,
-                    "response_time": end_time - start_time,
-                }
-            except Exception:
-                end_time = time.time()
-                return {
-                    "success": False,
-                    "response_time": end_time - start_time,
-                }
-
-        start_time = time.time()
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
-            futures = [executor.submit(make_request) for _ in range(num_requests)]
-            results = [
-                future.result() for future in concurrent.futures.as_completed(futures)
-            ]
-
-        end_time = time.time()
-        total_time = end_time - start_time
-
-        # Performance metrics
-        successful_requests = [r for r in results if r["success"]]
-        success_rate = len(successful_requests) / num_requests
-        response_times = [r["response_time"] for r in successful_requests]
         avg_response_time = (
-            sum(response_times) / len(response_times)
-            if response_times
+            sum(latencies_ns) / successful_requests / 1e9
+            if successful_requests
             else float("inf")
         )
         requests_per_second = num_requests / total_time
 
         # CI-friendly assertions
-        assert success_rate >= 0.95, (
-            f"Success rate {success_rate:.1%} below 95% under sustained load"
+        assert success_rate >= min_success, (
+            f"Success rate {success_rate:.1%} is below {min_success:.0%}"
         )
-        assert avg_response_time < 2.0, (
-            f"Average response time {avg_response_time:.3f}s too slow under load"
+        assert avg_response_time < max_avg, (
+            f"Average response time {avg_response_time:.3f}s is too slow"
         )
-        assert requests_per_second > 8, (
-            f"Throughput {requests_per_second:.1f} req/s too low under sustained load"
+        assert requests_per_second > min_rps, (
+            f"Throughput {requests_per_second:.1f} req/s is too low"
         )
 
-        print("\n✅ Sustained load test passed:")
+        print("\n✅ Load test passed:")
         print(f"   {num_requests} requests with {concurrency} concurrency")
         print(f"   Success rate: {success_rate:.1%}")
         print(f"   Avg response time: {avg_response_time:.3f}s")
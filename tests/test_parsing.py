@@ -0,0 +1,51 @@
+"""Tests for request body field extraction."""
+
+import json
+
+import pytest
+
+from api.parsing import extract_fields
+
+FIELDS = ("token", "email_timestream")
+
+
+def test_extract_fields() -> None:
+    body = json.dumps(
+        {
+            "token": "abc",
+            "nested": {"token": "ignored", "list": [1, 2, {"token": "x"}]},
+            "email_timestream": "2024-06-01T12:00:00",
+            "other": 1.5,
+        }
+    ).encode()
+
+    assert extract_fields(body, FIELDS) == {
+        "token": "abc",
+        "email_timestream": "2024-06-01T12:00:00",
+    }
+
+
+def test_extract_fields_missing() -> None:
+    body = b'{"token": "abc"}'
+
+    assert extract_fields(body, FIELDS) == {
+        "token": "abc",
+        "email_timestream": None,
+    }
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"",
+        b"{",
+        b'{"token": }',
+        b"[1, 2]",
+        b'"abc"',
+        b'{"token": "\\ud800"}',
+        b'{"token": 1e400}',
+    ],
+)
+def test_extract_fields_invalid(body: bytes) -> None:
+    with pytest.raises(ValueError):
+        extract_fields(body, FIELDS)